@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+
+# Ukuran sel grid (dalam derajat) untuk setiap tingkat zoom peta
+GRID_ZOOM_LEVELS = {
+    1: 0.05,   # ± 5,5 km
+    2: 0.01,   # ± 1,1 km
+    3: 0.002,  # ± 220 m
+}
+
+# Fungsi untuk mengubah kolom koordinat (teks atau angka) menjadi array float
+def parse_koordinat(series):
+    # Koma desimal diganti titik, nilai yang tidak valid (mis. '-') menjadi NaN
+    teks = series.astype(str).str.strip().str.replace(',', '.', regex=False)
+    return pd.to_numeric(teks, errors='coerce').to_numpy(dtype=float)
+
+# Fungsi untuk menghitung agregat peta (grid dan wilayah) secara vektor dengan NumPy
+def hitung_agregat_peta(df):
+    lat = parse_koordinat(df['latitude'])
+    lon = parse_koordinat(df['longitude'])
+
+    # Koordinat dianggap valid jika berada dalam rentang dan bukan titik (0, 0)
+    valid = (
+        np.isfinite(lat) & np.isfinite(lon)
+        & (np.abs(lat) <= 90) & (np.abs(lon) <= 180)
+        & ~((lat == 0) & (lon == 0))
+    )
+    lat_valid, lon_valid = lat[valid], lon[valid]
+
+    # Hitung jumlah laporan per sel grid untuk setiap tingkat zoom
+    grid_rows = []
+    for zoom, size in GRID_ZOOM_LEVELS.items():
+        sel = np.stack([np.floor(lat_valid / size), np.floor(lon_valid / size)], axis=1).astype(np.int64)
+        cells, counts = np.unique(sel, axis=0, return_counts=True)
+        grid_rows.extend(
+            (zoom, int(sel_lat), int(sel_lon), int(jumlah))
+            for (sel_lat, sel_lon), jumlah in zip(cells, counts)
+        )
+
+    # Hitung jumlah laporan dan titik tengah koordinat per kecamatan/kelurahan
+    wilayah = pd.DataFrame({
+        'kecamatan': df['kecamatan'].astype('string').fillna('-').str.strip().str.upper().to_numpy(),
+        'kelurahan': df['kelurahan'].astype('string').fillna('-').str.strip().str.upper().to_numpy(),
+        'jumlah': 1,
+        'jumlah_koordinat': valid.astype(int),
+        'total_lat': np.where(valid, lat, 0.0),
+        'total_lon': np.where(valid, lon, 0.0),
+    })
+    wilayah = wilayah.groupby(['kecamatan', 'kelurahan'], as_index=False).sum()
+    wilayah_rows = [
+        (row.kecamatan, row.kelurahan, int(row.jumlah), int(row.jumlah_koordinat),
+         float(row.total_lat), float(row.total_lon))
+        for row in wilayah.itertuples(index=False)
+    ]
+
+    return grid_rows, wilayah_rows
+
+# Batas bucket histogram durasi (detik), berskala logaritmik dari 1 menit hingga 1 tahun
+DURASI_BUCKET_EDGES = np.geomspace(60, 365 * 24 * 3600, 200)
+
+# Nilai perwakilan setiap bucket (rata-rata geometrik kedua batasnya)
+DURASI_BUCKET_NILAI = np.concatenate([
+    [DURASI_BUCKET_EDGES[0] / 2],
+    np.sqrt(DURASI_BUCKET_EDGES[:-1] * DURASI_BUCKET_EDGES[1:]),
+    [DURASI_BUCKET_EDGES[-1]],
+])
+
+# Fungsi untuk mengubah kolom durasi mentah dari CSV menjadi timedelta secara vektor
+def parse_durasi(series):
+    teks = series.astype(str).str.strip().str.lower()
+
+    # Format standar seperti '02:03:04' atau '1 days 02:03:04' (angka polos diabaikan)
+    durasi = pd.to_timedelta(teks.where(~teks.str.fullmatch(r'-?[\d.,]*')), errors='coerce')
+
+    # Format bahasa Indonesia seperti '2 hari 3 jam 15 menit'
+    total = pd.Series(0.0, index=series.index)
+    cocok = pd.Series(False, index=series.index)
+    for satuan, detik in {'hari': 86400, 'jam': 3600, 'menit': 60, 'detik': 1}.items():
+        angka = teks.str.extract(rf'(\d+(?:[.,]\d+)?)\s*{satuan}', expand=False)
+        nilai = pd.to_numeric(angka.str.replace(',', '.', regex=False), errors='coerce')
+        total += nilai.fillna(0) * detik
+        cocok |= nilai.notna()
+
+    return durasi.fillna(pd.to_timedelta(total.where(cocok), unit='s'))
+
+# Fungsi untuk menormalkan durasi: pakai kolom durasi, atau selisih waktu jika kosong
+def normalisasi_durasi(durasi_teks, waktu_mulai, waktu_selesai):
+    durasi = parse_durasi(durasi_teks).fillna(waktu_selesai - waktu_mulai)
+    return durasi.where(durasi >= pd.Timedelta(0))
+
+# Fungsi untuk menghitung histogram durasi per dinas, kategori, dan bulan
+def hitung_agregat_durasi(sumber, dinas, kategori, waktu, durasi):
+    detik = durasi.dt.total_seconds().to_numpy()
+    valid = np.isfinite(detik) & waktu.notna().to_numpy()
+
+    data = pd.DataFrame({
+        'dinas': dinas.astype('string').fillna('-').str.strip().to_numpy(dtype=object)[valid],
+        'kategori': kategori.astype('string').fillna('-').str.strip().to_numpy(dtype=object)[valid],
+        'bulan': waktu[valid].dt.to_period('M').dt.start_time.dt.date.to_numpy(),
+        'bucket': np.searchsorted(DURASI_BUCKET_EDGES, detik[valid], side='right'),
+        'jumlah': 1,
+    })
+    data = data.groupby(['dinas', 'kategori', 'bulan', 'bucket'], as_index=False)['jumlah'].sum()
+
+    return [
+        (sumber, row.dinas, row.kategori, row.bulan, int(row.bucket), int(row.jumlah))
+        for row in data.itertuples(index=False)
+    ]
+
+# Fungsi untuk menghitung persentil durasi (dalam jam) dari histogram per kelompok
+def hitung_persentil_durasi(df, keys, persentil=(50, 90, 99)):
+    grouped = df.groupby(keys + ['bucket'], as_index=False)['jumlah'].sum()
+    kode = grouped.groupby(keys, sort=True).ngroup().to_numpy()
+    hasil = grouped[keys].drop_duplicates().sort_values(keys).reset_index(drop=True)
+
+    # Matriks histogram: satu baris per kelompok, satu kolom per bucket
+    hist = np.zeros((len(hasil), len(DURASI_BUCKET_NILAI)), dtype=np.int64)
+    np.add.at(hist, (kode, grouped['bucket'].to_numpy()), grouped['jumlah'].to_numpy())
+    kumulatif = hist.cumsum(axis=1)
+    total = kumulatif[:, -1]
+
+    hasil['jumlah'] = total
+    for p in persentil:
+        idx = (kumulatif >= np.ceil(total * p / 100)[:, None]).argmax(axis=1)
+        hasil[f'p{p}_jam'] = (DURASI_BUCKET_NILAI[idx] / 3600).round(2)
+    return hasil
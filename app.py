@@ -7,6 +7,11 @@ import altair as alt
 from numerize import numerize
 from datetime import datetime 
 from auth import login
+from database import connect_db, fetch_data_from_db, fetch_table, parse_waktu
+from analitik import (
+    GRID_ZOOM_LEVELS, hitung_agregat_peta, parse_durasi, normalisasi_durasi, hitung_agregat_durasi,
+    hitung_persentil_durasi,
+)
 
 # Page configuration
 st.set_page_config(
@@ -15,34 +20,242 @@ st.set_page_config(
     layout="centered",
     initial_sidebar_state="expanded")
 
-def connect_db():
-    conn = psycopg2.connect(
-        dbname='callcenter', 
-        user='postgres', 
-        password='123456',
-        host='localhost',
-        port='5432'
+# Fungsi untuk memotong string jika melebihi batas panjang
+def truncate_string(value, max_length=200):
+    if isinstance(value, str) and len(value) > max_length:
+        return value[:max_length]  # Potong string jika panjangnya lebih dari max_length
+    return value
+
+# Fungsi untuk menambahkan agregat peta dari data laporan baru (inkremental)
+def simpan_agregat_peta(cur, df):
+    grid_rows, wilayah_rows = hitung_agregat_peta(df)
+
+    if grid_rows:
+        execute_values(cur, """
+        INSERT INTO agregat_grid (zoom, sel_lat, sel_lon, jumlah)
+        VALUES %s
+        ON CONFLICT (zoom, sel_lat, sel_lon)
+        DO UPDATE SET jumlah = agregat_grid.jumlah + EXCLUDED.jumlah
+        """, grid_rows)
+
+    if wilayah_rows:
+        execute_values(cur, """
+        INSERT INTO agregat_wilayah (kecamatan, kelurahan, jumlah, jumlah_koordinat, total_lat, total_lon)
+        VALUES %s
+        ON CONFLICT (kecamatan, kelurahan)
+        DO UPDATE SET
+            jumlah = agregat_wilayah.jumlah + EXCLUDED.jumlah,
+            jumlah_koordinat = agregat_wilayah.jumlah_koordinat + EXCLUDED.jumlah_koordinat,
+            total_lat = agregat_wilayah.total_lat + EXCLUDED.total_lat,
+            total_lon = agregat_wilayah.total_lon + EXCLUDED.total_lon
+        """, wilayah_rows)
+
+# Fungsi untuk mengisi agregat peta dari seluruh isi tabel laporan
+def isi_agregat_peta(cur):
+    df = fetch_table('laporan', ['latitude', 'longitude', 'kecamatan', 'kelurahan'])
+    if not df.empty:
+        simpan_agregat_peta(cur, df)
+
+# Fungsi untuk membuat tabel agregat peta dan mengisinya penuh saat pertama kali dibuat
+def migrasi_agregat_peta(cur):
+    cur.execute("SELECT to_regclass('agregat_grid') IS NULL OR to_regclass('agregat_wilayah') IS NULL")
+    if not cur.fetchone()[0]:
+        return
+
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS agregat_grid (
+        zoom SMALLINT NOT NULL,
+        sel_lat INTEGER NOT NULL,
+        sel_lon INTEGER NOT NULL,
+        jumlah INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (zoom, sel_lat, sel_lon)
     )
-    return conn
+    """)
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS agregat_wilayah (
+        kecamatan TEXT NOT NULL,
+        kelurahan TEXT NOT NULL,
+        jumlah INTEGER NOT NULL DEFAULT 0,
+        jumlah_koordinat INTEGER NOT NULL DEFAULT 0,
+        total_lat DOUBLE PRECISION NOT NULL DEFAULT 0,
+        total_lon DOUBLE PRECISION NOT NULL DEFAULT 0,
+        PRIMARY KEY (kecamatan, kelurahan)
+    )
+    """)
 
-# Fungsi untuk mengambil data dari database berdasarkan query
-def fetch_data_from_db(query):
-    # Koneksi ke database
+    # Agregat harus mencakup data lama, bukan hanya unggahan berikutnya
+    cur.execute("TRUNCATE agregat_grid, agregat_wilayah")
+    isi_agregat_peta(cur)
+
+# Fungsi untuk menghitung ulang seluruh agregat peta dari tabel laporan
+def bangun_ulang_agregat_peta():
     conn = connect_db()
-    
-    # Menggunakan pandas untuk membaca hasil query dan mengubahnya menjadi DataFrame
-    df = pd.read_sql(query, conn)
-    
-    # Menutup koneksi
-    conn.close()
+    cur = conn.cursor()
+    try:
+        cur.execute("TRUNCATE agregat_grid, agregat_wilayah")
+        isi_agregat_peta(cur)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+        conn.close()
 
+    load_agregat_grid.clear()
+    load_agregat_wilayah.clear()
+
+# Fungsi untuk mengambil agregat grid pada tingkat zoom tertentu (dengan cache)
+@st.cache_data(ttl=3600)
+def load_agregat_grid(zoom):
+    size = GRID_ZOOM_LEVELS[zoom]
+    df = fetch_data_from_db(f"SELECT sel_lat, sel_lon, jumlah FROM agregat_grid WHERE zoom = {int(zoom)}")
+
+    # Titik tengah sel grid sebagai koordinat heatmap
+    df['latitude'] = (df['sel_lat'] + 0.5) * size
+    df['longitude'] = (df['sel_lon'] + 0.5) * size
     return df
 
-# Fungsi untuk memotong string jika melebihi batas panjang
-def truncate_string(value, max_length=200):
-    if isinstance(value, str) and len(value) > max_length:
-        return value[:max_length]  # Potong string jika panjangnya lebih dari max_length
-    return value
+# Fungsi untuk mengambil agregat per kecamatan/kelurahan (dengan cache)
+@st.cache_data(ttl=3600)
+def load_agregat_wilayah():
+    return fetch_data_from_db("SELECT * FROM agregat_wilayah")
+
+# Kolom interval durasi hasil normalisasi saat ingest untuk setiap tabel
+KOLOM_INTERVAL_TABEL = {
+    'laporan': 'durasi_pengerjaan_interval',
+    'tiket_dinas': 'durasi_penanganan_interval',
+    'log_dinas': 'durasi_penanganan_interval',
+}
+
+# Fungsi untuk mengecek apakah sebuah kolom sudah ada pada tabel
+def kolom_ada(cur, table_name, column):
+    cur.execute(
+        "SELECT 1 FROM information_schema.columns WHERE table_name = %s AND column_name = %s",
+        (table_name, column)
+    )
+    return cur.fetchone() is not None
+
+# Fungsi untuk mengisi kolom interval durasi pada baris lama (sekali, saat kolom dibuat)
+def isi_interval_durasi(cur, table_name):
+    if table_name == 'laporan':
+        cur.execute("SELECT ctid::text, durasi_pengerjaan, waktu_lapor, waktu_selesai FROM laporan")
+    elif table_name == 'tiket_dinas':
+        cur.execute("SELECT ctid::text, durasi_penanganan, tiket_dibuat, tiket_selesai FROM tiket_dinas")
+    else:
+        cur.execute("SELECT ctid::text, durasi_penanganan, NULL, NULL FROM log_dinas")
+    df = pd.DataFrame(cur.fetchall(), columns=['ctid', 'durasi', 'mulai', 'selesai'])
+    if df.empty:
+        return
+
+    durasi = normalisasi_durasi(df['durasi'], parse_waktu(df['mulai']), parse_waktu(df['selesai']))
+
+    kolom = KOLOM_INTERVAL_TABEL[table_name]
+    rows = [(ctid, nilai) for ctid, nilai in zip(df['ctid'], to_interval_column(durasi)) if nilai is not None]
+    if rows:
+        execute_values(cur, f"""
+        UPDATE {table_name} AS t SET {kolom} = v.durasi
+        FROM (VALUES %s) AS v(ctid, durasi)
+        WHERE t.ctid = v.ctid::tid
+        """, rows, template="(%s, %s::interval)")
+
+# Fungsi untuk menambahkan kolom interval durasi yang belum ada dan mengisi baris lama
+def migrasi_interval_durasi(cur):
+    for table_name, kolom in KOLOM_INTERVAL_TABEL.items():
+        if not kolom_ada(cur, table_name, kolom):
+            cur.execute(f"ALTER TABLE {table_name} ADD COLUMN {kolom} INTERVAL")
+            isi_interval_durasi(cur, table_name)
+
+# Fungsi untuk mengubah timedelta menjadi kolom interval yang siap dimasukkan ke database
+def to_interval_column(durasi):
+    return durasi.astype(object).where(durasi.notna(), None)
+
+# Fungsi untuk menambahkan histogram durasi ke tabel agregat (inkremental)
+def simpan_agregat_durasi(cur, rows):
+    if rows:
+        execute_values(cur, """
+        INSERT INTO agregat_durasi (sumber, dinas, kategori, bulan, bucket, jumlah)
+        VALUES %s
+        ON CONFLICT (sumber, dinas, kategori, bulan, bucket)
+        DO UPDATE SET jumlah = agregat_durasi.jumlah + EXCLUDED.jumlah
+        """, rows)
+
+# Fungsi untuk mengambil kategori laporan berdasarkan nomor laporan
+def lookup_kategori(cur, no_laporan):
+    cur.execute(
+        "SELECT no_laporan, kategori FROM laporan WHERE no_laporan = ANY(%s)",
+        (list(no_laporan.astype(str).unique()),)
+    )
+    kategori = dict(cur.fetchall())
+    return no_laporan.astype(str).map(kategori).fillna('-')
+
+# Fungsi untuk mengisi agregat durasi dari kolom interval di tabel laporan dan tiket_dinas
+def isi_agregat_durasi(cur):
+    df_laporan = fetch_table('laporan', ['dinas_terkait', 'kategori', 'waktu_lapor', 'durasi_pengerjaan_interval'])
+    df_tiket = fetch_data_from_db("""
+        SELECT t.dinas, COALESCE(l.kategori, '-') AS kategori, t.tiket_dibuat, t.durasi_penanganan_interval
+        FROM tiket_dinas t
+        LEFT JOIN (SELECT DISTINCT ON (no_laporan) no_laporan, kategori FROM laporan) l
+            ON l.no_laporan = t.no_laporan
+    """)
+
+    rows = []
+    if not df_laporan.empty:
+        rows += hitung_agregat_durasi(
+            'laporan', df_laporan['dinas_terkait'], df_laporan['kategori'],
+            pd.to_datetime(df_laporan['waktu_lapor'], errors='coerce'),
+            pd.to_timedelta(df_laporan['durasi_pengerjaan_interval'])
+        )
+    if not df_tiket.empty:
+        rows += hitung_agregat_durasi(
+            'tiket_dinas', df_tiket['dinas'], df_tiket['kategori'],
+            parse_waktu(df_tiket['tiket_dibuat']),
+            pd.to_timedelta(df_tiket['durasi_penanganan_interval'])
+        )
+    simpan_agregat_durasi(cur, rows)
+
+# Fungsi untuk membuat tabel agregat durasi dan mengisinya penuh saat pertama kali dibuat
+def migrasi_agregat_durasi(cur):
+    cur.execute("SELECT to_regclass('agregat_durasi') IS NULL")
+    if not cur.fetchone()[0]:
+        return
+
+    cur.execute("""
+    CREATE TABLE agregat_durasi (
+        sumber TEXT NOT NULL,
+        dinas TEXT NOT NULL,
+        kategori TEXT NOT NULL,
+        bulan DATE NOT NULL,
+        bucket SMALLINT NOT NULL,
+        jumlah INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (sumber, dinas, kategori, bulan, bucket)
+    )
+    """)
+    isi_agregat_durasi(cur)
+
+# Fungsi untuk menghitung ulang seluruh agregat durasi
+def bangun_ulang_agregat_durasi():
+    conn = connect_db()
+    cur = conn.cursor()
+    try:
+        cur.execute("TRUNCATE agregat_durasi")
+        isi_agregat_durasi(cur)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+        conn.close()
+
+    load_agregat_durasi.clear()
+
+# Fungsi untuk mengambil histogram durasi dari tabel agregat (dengan cache)
+@st.cache_data(ttl=3600)
+def load_agregat_durasi(sumber):
+    return fetch_data_from_db(
+        f"SELECT dinas, kategori, bulan, bucket, jumlah FROM agregat_durasi WHERE sumber = '{sumber}'"
+    )
 
 def insert_csv_to_db(df, table_name):
     # Ubah nama kolom menjadi huruf kecil dan ganti spasi dengan underscore
@@ -65,6 +278,21 @@ def insert_csv_to_db(df, table_name):
     for col in df.columns:
         df[col] = df[col].apply(truncate_string)
 
+    # Normalisasi kolom durasi menjadi interval sekali saat ingest
+    if table_name == 'laporan':
+        waktu_mulai = pd.to_datetime(df['waktu_lapor'], errors='coerce')
+        durasi = normalisasi_durasi(df['durasi_pengerjaan'], waktu_mulai,
+                                    pd.to_datetime(df['waktu_selesai'], errors='coerce'))
+        df['durasi_pengerjaan_interval'] = to_interval_column(durasi)
+    elif table_name == 'tiket_dinas':
+        # Tanggal tiket dibaca dengan aturan yang sama seperti datestyle di bawah
+        waktu_mulai = parse_waktu(df['tiket_dibuat'])
+        durasi = normalisasi_durasi(df['durasi_penanganan'], waktu_mulai, parse_waktu(df['tiket_selesai']))
+        df['durasi_penanganan_interval'] = to_interval_column(durasi)
+    elif table_name == 'log_dinas':
+        durasi = parse_durasi(df['durasi_penanganan'])
+        df['durasi_penanganan_interval'] = to_interval_column(durasi.where(durasi >= pd.Timedelta(0)))
+
     # Koneksi ke database
     conn = connect_db()
     cur = conn.cursor()
@@ -80,7 +308,8 @@ def insert_csv_to_db(df, table_name):
             agent_l1, tipe_laporan, pelapor, no_telp, kategori, 
             sub_kategori_1, sub_kategori_2, deskripsi, lokasi_kejadian, 
             kecamatan, kelurahan, catatan_lokasi, latitude, longitude, 
-            waktu_selesai, ditutup_oleh, status, dinas_terkait, durasi_pengerjaan
+            waktu_selesai, ditutup_oleh, status, dinas_terkait, durasi_pengerjaan,
+            durasi_pengerjaan_interval
         ) 
         VALUES %s
         """
@@ -89,24 +318,27 @@ def insert_csv_to_db(df, table_name):
                                             'agent_l1', 'tipe_laporan', 'pelapor', 'no_telp', 'kategori', 
                                             'sub_kategori_1', 'sub_kategori_2', 'deskripsi', 'lokasi_kejadian', 
                                             'kecamatan', 'kelurahan', 'catatan_lokasi', 'latitude', 'longitude', 
-                                            'waktu_selesai', 'ditutup_oleh', 'status', 'dinas_terkait', 'durasi_pengerjaan']].values]
+                                            'waktu_selesai', 'ditutup_oleh', 'status', 'dinas_terkait', 'durasi_pengerjaan',
+                                            'durasi_pengerjaan_interval']].values]
     elif table_name == 'tiket_dinas':
         # Query untuk tabel tiket dinas
         insert_query = """
         INSERT INTO tiket_dinas (
             no_laporan, uid_dinas, no_tiket_dinas, dinas, l2_notes, 
-            status, tiket_dibuat, tiket_selesai, durasi_penanganan
+            status, tiket_dibuat, tiket_selesai, durasi_penanganan, durasi_penanganan_interval
         ) 
         VALUES %s
         """
         data = [tuple(x) for x in df[['no.laporan', 'uid_dinas', 'no.tiket_dinas', 'dinas', 'l2_notes', 
-                                      'status', 'tiket_dibuat', 'tiket_selesai', 'durasi_penanganan']].values]
+                                      'status', 'tiket_dibuat', 'tiket_selesai', 'durasi_penanganan',
+                                      'durasi_penanganan_interval']].values]
     elif table_name == 'log_dinas':
         # Query untuk tabel log dinas
         insert_query = """
         INSERT INTO log_dinas (
             no_laporan, no_tiket_dinas, dinas, agent_l2, status, 
-            waktu_proses, durasi_penanganan, catatan, foto_1, foto_2, foto_3, foto_4
+            waktu_proses, durasi_penanganan, catatan, foto_1, foto_2, foto_3, foto_4,
+            durasi_penanganan_interval
         ) 
         VALUES %s
         """
@@ -116,7 +348,7 @@ def insert_csv_to_db(df, table_name):
         """
         data = [tuple(x) for x in df[['no.laporan', 'no.tiket_dinas', 'dinas', 'agent_l2', 'status', 
                                       'waktu_proses', 'durasi_penanganan', 'catatan', 'foto_1', 
-                                      'foto_2', 'foto_3', 'foto_4']].values]
+                                      'foto_2', 'foto_3', 'foto_4', 'durasi_penanganan_interval']].values]
     valid_data = []
     duplicate_count = 0  # Hitung data duplikat
     inserted_count = 0  # Hitung data yang berhasil dimasukkan
@@ -137,7 +369,24 @@ def insert_csv_to_db(df, table_name):
             execute_values(cur, insert_query, valid_data)
             inserted_count = len(valid_data)  # Hitung data yang berhasil dimasukkan
 
+        # Perbarui agregat peta secara inkremental dalam transaksi yang sama
+        if table_name == 'laporan' and inserted_count > 0:
+            simpan_agregat_peta(cur, df)
+
+        # Perbarui histogram durasi secara inkremental dalam transaksi yang sama
+        if table_name == 'laporan' and inserted_count > 0:
+            simpan_agregat_durasi(cur, hitung_agregat_durasi(
+                'laporan', df['dinas_terkait'], df['kategori'], waktu_mulai, durasi))
+        elif table_name == 'tiket_dinas' and inserted_count > 0:
+            simpan_agregat_durasi(cur, hitung_agregat_durasi(
+                'tiket_dinas', df['dinas'], lookup_kategori(cur, df['no.laporan']), waktu_mulai, durasi))
+
         conn.commit()
+        if table_name == 'laporan' and inserted_count > 0:
+            load_agregat_grid.clear()
+            load_agregat_wilayah.clear()
+        if table_name in ['laporan', 'tiket_dinas'] and inserted_count > 0:
+            load_agregat_durasi.clear()
         if inserted_count > 0:
             st.success(f"Data berhasil dimasukkan ke dalam database!")
         if duplicate_count > 0:
@@ -152,6 +401,27 @@ def insert_csv_to_db(df, table_name):
         cur.close()
         conn.close()
 
+# Fungsi untuk menjalankan perubahan skema satu kali saat aplikasi dimulai
+@st.cache_resource
+def migrasi_skema():
+    # Tiap langkah di-commit sendiri agar langkah berikutnya membaca hasilnya
+    for langkah in [migrasi_interval_durasi, migrasi_agregat_peta, migrasi_agregat_durasi]:
+        conn = connect_db()
+        cur = conn.cursor()
+        try:
+            # Kunci agar migrasi tidak berjalan bersamaan dari beberapa proses
+            cur.execute("SELECT pg_advisory_xact_lock(hashtext('migrasi_skema'))")
+            langkah(cur)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cur.close()
+            conn.close()
+
+migrasi_skema()
+
 with open("style.css") as f:
     st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
 
@@ -228,7 +498,7 @@ def generate_visualizations(df, table_name):
 
 # Streamlit interface
 st.sidebar.title("Menu")
-options = st.sidebar.selectbox("Pilih Menu", ["HomePage", "Unggah Data", "Statistik", "Pencarian Data"])
+options = st.sidebar.selectbox("Pilih Menu", ["HomePage", "Unggah Data", "Statistik", "Analitik SLA", "Peta Laporan", "Pencarian Data"])
 
 # Opsi untuk halaman yang dipilih
 if options == "HomePage":
@@ -338,15 +608,13 @@ if options == "HomePage":
             col1, col2 = st.columns(2)
 
             with col1:
-                query_laporan = "SELECT status FROM laporan"
-                df_laporan = fetch_data_from_db(query_laporan)
+                df_laporan = fetch_table('laporan', ['status'])
                 if not df_laporan.empty:
                     fig_pie_laporan = px.pie(df_laporan, names='status', title='Distribusi Status Laporan')
                     st.plotly_chart(fig_pie_laporan)
 
             with col2:
-                query_tiket_dinas = "SELECT status FROM tiket_dinas"
-                df_tiket_dinas = fetch_data_from_db(query_tiket_dinas)
+                df_tiket_dinas = fetch_table('tiket_dinas', ['status'])
                 if not df_tiket_dinas.empty:
                     fig_pie_tiket = px.pie(df_tiket_dinas, names='status', title='Distribusi Status Tiket Dinas')
                     st.plotly_chart(fig_pie_tiket)
@@ -355,8 +623,7 @@ if options == "HomePage":
             col3, col4 = st.columns(2)
 
             with col3:
-                query_log_dinas = "SELECT status FROM log_dinas"
-                df_log_dinas = fetch_data_from_db(query_log_dinas)
+                df_log_dinas = fetch_table('log_dinas', ['status'])
                 if not df_log_dinas.empty:
                     fig_pie_log = px.pie(df_log_dinas, names='status', title='Distribusi Status Log Dinas')
                     st.plotly_chart(fig_pie_log)
@@ -504,21 +771,18 @@ elif options == "Statistik":
     statistik_table = st.selectbox("Pilih tabel untuk dianalisis:", ['laporan', 'tiket_dinas', 'log_dinas'])
     
     if statistik_table == 'laporan':
-        query = "SELECT * FROM laporan"
         status_options = ['baru', 'proses', 'selesai']
         time_column = 'waktu_lapor'
     elif statistik_table == 'tiket_dinas':
-        query = "SELECT * FROM tiket_dinas"
         status_options = ['aktif', 'dikerjakan', 'selesai']
         time_column = 'tiket_dibuat'
     elif statistik_table == 'log_dinas':
-        query = "SELECT * FROM log_dinas"
         status_options = ['aktif', 'dikerjakan', 'verivikasi l2', 'selesai', 'selesai tanpa eskalasi', 
                           'perbaharuan laporan', 'transfer tiket']
         time_column = 'waktu_proses'
  
     # Ambil data dari database
-    df_statistik = fetch_data_from_db(query)
+    df_statistik = fetch_table(statistik_table)
     if not df_statistik.empty:
         df_statistik['status'] = df_statistik['status'].str.strip().str.lower()
 
@@ -549,6 +813,10 @@ elif options == "Statistik":
 
             # Filter berdasarkan rentang waktu
             df_statistik = df_statistik[(df_statistik[time_column] >= start_date) & (df_statistik[time_column] <= end_date)]
+
+        # Buang kategori yang tidak muncul lagi setelah difilter agar tidak tampil sebagai 0 di grafik
+        for col in df_statistik.select_dtypes('category').columns:
+            df_statistik[col] = df_statistik[col].cat.remove_unused_categories()
         
         # Tampilkan data
         st.write("Data Terkini:")
@@ -575,6 +843,122 @@ elif options == "Statistik":
     else:
         st.warning("Tidak ada data yang tersedia untuk tabel ini.")
 
+# Fitur Analitik SLA
+elif options == "Analitik SLA":
+    st.title("⏱️ Analitik SLA")
+
+    # Tombol diletakkan sebelum grafik agar grafik langsung memakai agregat yang baru
+    if st.button("Hitung Ulang Agregat Durasi"):
+        bangun_ulang_agregat_durasi()
+        st.success("Agregat durasi berhasil dihitung ulang!")
+
+    sumber_label = st.selectbox("Pilih Sumber Durasi:", ["Laporan (Durasi Pengerjaan)", "Tiket Dinas (Durasi Penanganan)"])
+    sumber = 'laporan' if sumber_label.startswith("Laporan") else 'tiket_dinas'
+    df_durasi = load_agregat_durasi(sumber)
+
+    if not df_durasi.empty:
+        df_durasi['bulan'] = pd.to_datetime(df_durasi['bulan'])
+
+        # Filter berdasarkan rentang bulan
+        bulan_min, bulan_max = df_durasi['bulan'].min().date(), df_durasi['bulan'].max().date()
+        date_range = st.date_input("Pilih Rentang Waktu:", value=(bulan_min, bulan_max))
+        if isinstance(date_range, tuple) and len(date_range) == 2:
+            start_date, end_date = pd.to_datetime(date_range[0]), pd.to_datetime(date_range[1])
+            df_durasi = df_durasi[(df_durasi['bulan'] >= start_date.to_period('M').start_time) &
+                                  (df_durasi['bulan'] <= end_date)]
+
+        kelompok = st.selectbox("Kelompokkan Berdasarkan:", ["Dinas", "Kategori", "Bulan"])
+        kolom = kelompok.lower()
+
+        if not df_durasi.empty:
+            df_persentil = hitung_persentil_durasi(df_durasi, [kolom])
+
+            # Ringkasan keseluruhan
+            df_total = hitung_persentil_durasi(df_durasi.assign(semua='Semua'), ['semua'])
+            col1, col2, col3, col4 = st.columns(4)
+            col1.metric("Jumlah Data", int(df_total['jumlah'].iloc[0]))
+            col2.metric("P50 (jam)", df_total['p50_jam'].iloc[0])
+            col3.metric("P90 (jam)", df_total['p90_jam'].iloc[0])
+            col4.metric("P99 (jam)", df_total['p99_jam'].iloc[0])
+
+            if kolom == 'bulan':
+                fig_sla = px.line(df_persentil, x='bulan', y=['p50_jam', 'p90_jam', 'p99_jam'],
+                                  title='Persentil Durasi per Bulan',
+                                  labels={'bulan': 'Bulan', 'value': 'Durasi (jam)', 'variable': 'Persentil'})
+            else:
+                df_persentil = df_persentil.sort_values(by='jumlah', ascending=False)
+                fig_sla = px.bar(df_persentil.head(20), x=kolom, y=['p50_jam', 'p90_jam', 'p99_jam'],
+                                 barmode='group', title=f'Persentil Durasi per {kelompok} (Top 20)',
+                                 labels={kolom: kelompok, 'value': 'Durasi (jam)', 'variable': 'Persentil'})
+            st.plotly_chart(fig_sla)
+            st.dataframe(df_persentil)
+        else:
+            st.warning("Tidak ada data durasi pada rentang waktu ini.")
+    else:
+        st.warning("Tidak ada data durasi yang tersedia.")
+
+# Fitur Peta Laporan
+elif options == "Peta Laporan":
+    st.title("🗺️ Peta Laporan")
+
+    # Tombol diletakkan sebelum grafik agar grafik langsung memakai agregat yang baru
+    if st.button("Hitung Ulang Agregat Peta"):
+        bangun_ulang_agregat_peta()
+        st.success("Agregat peta berhasil dihitung ulang!")
+
+    tingkat = st.selectbox("Pilih Tingkat Agregasi:", [
+        "Kecamatan", "Kelurahan", "Grid Kasar (± 5 km)", "Grid Sedang (± 1 km)", "Grid Detail (± 200 m)"
+    ])
+
+    if tingkat in ["Kecamatan", "Kelurahan"]:
+        df_wilayah = load_agregat_wilayah()
+        if not df_wilayah.empty:
+            kunci = ['kecamatan'] if tingkat == "Kecamatan" else ['kecamatan', 'kelurahan']
+            df_peta = df_wilayah.groupby(kunci, as_index=False)[
+                ['jumlah', 'jumlah_koordinat', 'total_lat', 'total_lon']
+            ].sum()
+            df_peta = df_peta.sort_values(by='jumlah', ascending=False)
+
+            # Nama kelurahan bisa sama di kecamatan berbeda, jadi labelnya disertai kecamatan
+            if tingkat == "Kecamatan":
+                df_peta['wilayah'] = df_peta['kecamatan']
+            else:
+                df_peta['wilayah'] = df_peta['kelurahan'] + ', ' + df_peta['kecamatan']
+
+            # Titik tengah wilayah dari rata-rata koordinat laporan yang valid
+            df_koordinat = df_peta[df_peta['jumlah_koordinat'] > 0].copy()
+            df_koordinat['latitude'] = df_koordinat['total_lat'] / df_koordinat['jumlah_koordinat']
+            df_koordinat['longitude'] = df_koordinat['total_lon'] / df_koordinat['jumlah_koordinat']
+
+            if not df_koordinat.empty:
+                fig_peta = px.scatter_map(
+                    df_koordinat, lat='latitude', lon='longitude', size='jumlah', hover_name='wilayah',
+                    hover_data={'jumlah': True, 'latitude': False, 'longitude': False},
+                    zoom=10, map_style="open-street-map", title=f"Jumlah Laporan per {tingkat}"
+                )
+                st.plotly_chart(fig_peta)
+
+            fig_wilayah = px.bar(
+                df_peta.head(20), x='wilayah', y='jumlah',
+                labels={'wilayah': tingkat, 'jumlah': 'Jumlah'}, title=f"Top 20 {tingkat}"
+            )
+            st.plotly_chart(fig_wilayah)
+            st.dataframe(df_peta[kunci + ['jumlah']])
+        else:
+            st.warning("Tidak ada data laporan yang tersedia untuk peta.")
+    else:
+        zoom = {"Grid Kasar (± 5 km)": 1, "Grid Sedang (± 1 km)": 2, "Grid Detail (± 200 m)": 3}[tingkat]
+        df_grid = load_agregat_grid(zoom)
+        if not df_grid.empty:
+            fig_heatmap = px.density_map(
+                df_grid, lat='latitude', lon='longitude', z='jumlah', radius=8 + 4 * zoom,
+                zoom=8 + zoom, map_style="open-street-map", title="Heatmap Laporan"
+            )
+            st.plotly_chart(fig_heatmap)
+            st.metric(label="Total Laporan Berkoordinat", value=int(df_grid['jumlah'].sum()))
+        else:
+            st.warning("Tidak ada data laporan yang tersedia untuk peta.")
+
 # Fitur Pencarian Data
 elif options == "Pencarian Data":
     st.title("🔍 Pencarian Data")
@@ -591,6 +975,7 @@ elif options == "Pencarian Data":
             l.no_laporan, l.no_telp, l.uid, l.tipe_laporan, l.kecamatan, l.kelurahan, l.status AS status_laporan,
             l.waktu_lapor, l.pelapor, l.kategori, l.sub_kategori_1, l.sub_kategori_2, l.lokasi_kejadian,
             t.no_tiket_dinas, t.dinas, t.status AS status_tiket, t.tiket_dibuat, t.tiket_selesai, 
+            l.durasi_pengerjaan_interval AS durasi,
             g.no_tiket_dinas AS log_no_tiket, g.dinas AS log_dinas, g.status AS status_log, g.waktu_proses, g.catatan
         FROM 
             laporan l
@@ -624,6 +1009,10 @@ elif options == "Pencarian Data":
         df_result = fetch_data_from_db(query)
 
         if not df_result.empty:
+            # Durasi sudah dinormalisasi saat ingest, cukup diformat
+            durasi = pd.to_timedelta(df_result['durasi'])
+            df_result['durasi'] = durasi.astype(str).where(durasi.notna(), '-')
+
             # Gantikan nilai None dengan tanda "-"
             df_result = df_result.fillna('-')
 
@@ -652,36 +1041,6 @@ elif options == "Pencarian Data":
             # Terapkan logika status pada DataFrame
             df_result['status_laporan'] = df_result.apply(get_latest_status, axis=1)
 
-            def convert_to_datetime(value):
-                """Mengonversi nilai menjadi datetime jika belum dalam format datetime."""
-                if isinstance(value, str):
-                    try:
-                        # Coba konversi string ke datetime dengan format yang umum
-                        return datetime.strptime(value, '%Y-%m-%d %H:%M:%S')
-                    except ValueError:
-                        return None
-                elif isinstance(value, pd.Timestamp):
-                    return value.to_pydatetime()
-                return value
-
-            def calculate_duration(row):
-                """Menghitung durasi antara waktu_lapor dan tiket_selesai."""
-                # Konversi ke datetime terlebih dahulu
-                waktu_lapor = convert_to_datetime(row['waktu_lapor'])
-                tiket_selesai = convert_to_datetime(row['tiket_selesai'])
-                
-                # Jika kedua waktu ada, hitung durasinya
-                if waktu_lapor and tiket_selesai:
-                    duration = tiket_selesai - waktu_lapor
-                    return duration
-                return None  # Jika salah satu kosong, kembalikan None
-
-            # Terapkan fungsi untuk menghitung durasi pada DataFrame
-            df_result['durasi'] = df_result.apply(calculate_duration, axis=1)
-
-            # Menambahkan format untuk durasi (jika durasi ada)
-            df_result['durasi'] = df_result['durasi'].apply(lambda x: str(x) if x is not None else '-')
-
             # Hapus duplikat berdasarkan kolom-kolom penting (misal: no_laporan atau no_tiket_dinas)
             df_result = df_result.drop_duplicates(subset=["no_laporan", "no_tiket_dinas"])
 
@@ -0,0 +1,49 @@
+# Skrip untuk membandingkan waktu muat dan puncak memori antara
+# fetch_data_from_db (pd.read_sql) dan fetch_table (cursor server-side + tipe Arrow/kategori).
+# Jalankan: python benchmark_load.py
+import resource
+import subprocess
+import sys
+import time
+
+TABLES = ['laporan', 'tiket_dinas', 'log_dinas']
+METODE = ['read_sql', 'fetch_table', 'read_sql_status', 'fetch_table_status']
+
+# Fungsi untuk mengukur satu metode pada satu tabel (dijalankan di proses terpisah)
+def ukur(metode, table_name):
+    import pyarrow  # noqa: F401  (dimuat lebih dulu agar tidak ikut terhitung)
+    from database import fetch_data_from_db, fetch_table
+
+    awal = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    mulai = time.perf_counter()
+    if metode == 'read_sql':
+        df = fetch_data_from_db(f"SELECT * FROM {table_name}")
+    elif metode == 'fetch_table':
+        df = fetch_table(table_name)
+    elif metode == 'read_sql_status':
+        df = fetch_data_from_db(f"SELECT status FROM {table_name}")
+    else:
+        df = fetch_table(table_name, ['status'])
+    waktu = time.perf_counter() - mulai
+
+    # ru_maxrss dalam KB di Linux
+    puncak = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - awal) / 1024
+    ukuran = df.memory_usage(deep=True).sum() / 2**20
+    print(f"{len(df)} {waktu:.2f} {puncak:.1f} {ukuran:.1f}")
+
+def main():
+    print(f"{'Tabel':<12} {'Metode':<20} {'Baris':>8} {'Waktu (s)':>10} {'Puncak RSS (MB)':>16} {'DataFrame (MB)':>15}")
+    for table_name in TABLES:
+        for metode in METODE:
+            hasil = subprocess.run(
+                [sys.executable, __file__, metode, table_name],
+                capture_output=True, text=True, check=True
+            )
+            baris, waktu, puncak, ukuran = hasil.stdout.split()
+            print(f"{table_name:<12} {metode:<20} {baris:>8} {waktu:>10} {puncak:>16} {ukuran:>15}")
+
+if __name__ == '__main__':
+    if len(sys.argv) == 3:
+        ukur(sys.argv[1], sys.argv[2])
+    else:
+        main()
@@ -0,0 +1,129 @@
+import pandas as pd
+import psycopg2
+from psycopg2 import sql
+
+# Kolom teks dengan sedikit nilai unik, disimpan sebagai tipe kategori
+KOLOM_KATEGORI = {
+    'tipe_saluran', 'agent_l1', 'agent_l2', 'tipe_laporan', 'kategori', 'sub_kategori_1', 'sub_kategori_2',
+    'kecamatan', 'kelurahan', 'ditutup_oleh', 'status', 'dinas_terkait', 'dinas',
+}
+
+# Kolom tanggal/waktu
+KOLOM_WAKTU = {'waktu_lapor', 'waktu_selesai', 'tiket_dibuat', 'tiket_selesai', 'waktu_proses'}
+
+# Kolom angka
+KOLOM_ANGKA = {'latitude', 'longitude'}
+
+# OID tipe PostgreSQL (dari cur.description) untuk menentukan tipe kolom
+OID_TEKS = {25, 1042, 1043}
+OID_BULAT = {20, 21, 23}
+OID_DESIMAL = {700, 701, 1700}
+OID_BOOLEAN = {16}
+OID_TANGGAL = {1082, 1114}
+OID_TANGGAL_TZ = {1184}
+OID_INTERVAL = {1186}
+
+def connect_db():
+    conn = psycopg2.connect(
+        dbname='callcenter',
+        user='postgres',
+        password='123456',
+        host='localhost',
+        port='5432'
+    )
+    return conn
+
+# Fungsi untuk mengambil data dari database berdasarkan query
+def fetch_data_from_db(query):
+    # Koneksi ke database
+    conn = connect_db()
+
+    # Menggunakan pandas untuk membaca hasil query dan mengubahnya menjadi DataFrame
+    df = pd.read_sql(query, conn)
+
+    # Menutup koneksi
+    conn.close()
+
+    return df
+
+# Fungsi untuk mengubah teks tanggal menjadi datetime sesuai datestyle 'ISO, DMY' saat ingest
+def parse_waktu(series):
+    # Format ISO (YYYY-MM-DD) dibaca lebih dulu, sisanya sebagai DD/MM/YYYY
+    iso = pd.to_datetime(series, errors='coerce', format='ISO8601')
+    dmy = pd.to_datetime(series.where(iso.isna()), errors='coerce', dayfirst=True, format='mixed')
+    return iso.fillna(dmy)
+
+# Fungsi untuk menentukan konversi tipe setiap kolom satu kali dari cur.description
+def tentukan_konversi(description):
+    konversi = {}
+    for desc in description:
+        col, oid = desc[0], desc[1]
+        if oid in OID_TEKS and col in KOLOM_WAKTU:
+            konversi[col] = parse_waktu
+        elif oid in OID_TEKS and col in KOLOM_ANGKA:
+            konversi[col] = lambda s: pd.to_numeric(
+                s.astype('string').str.replace(',', '.', regex=False), errors='coerce'
+            ).astype('float64')
+        elif oid in OID_TEKS:
+            # Teks disimpan di buffer Arrow, bukan sebagai objek str Python per baris
+            konversi[col] = lambda s: s.astype('string[pyarrow]')
+        elif oid in OID_BULAT:
+            # Int64 (nullable) agar batch yang seluruhnya NULL tetap bertipe sama
+            konversi[col] = lambda s: s.astype('Int64')
+        elif oid in OID_DESIMAL:
+            konversi[col] = lambda s: s.astype('float64')
+        elif oid in OID_BOOLEAN:
+            konversi[col] = lambda s: s.astype('boolean')
+        elif oid in OID_TANGGAL:
+            konversi[col] = lambda s: pd.to_datetime(s)
+        elif oid in OID_TANGGAL_TZ:
+            konversi[col] = lambda s: pd.to_datetime(s, utc=True)
+        elif oid in OID_INTERVAL:
+            konversi[col] = lambda s: pd.to_timedelta(s)
+    return konversi
+
+# Fungsi untuk mengubah tipe kolom satu batch sesuai konversi yang sudah ditentukan
+def set_tipe_kolom(df, konversi):
+    for col, fungsi in konversi.items():
+        df[col] = fungsi(df[col])
+    return df
+
+# Fungsi untuk mengambil isi tabel secara bertahap dengan tipe kolom yang hemat memori
+def fetch_table(table_name, columns=None, batch_size=10000):
+    # Hanya ambil kolom yang dibutuhkan halaman (semua kolom jika columns kosong)
+    if columns:
+        kolom = sql.SQL(', ').join(sql.Identifier(col) for col in columns)
+    else:
+        kolom = sql.SQL('*')
+    query = sql.SQL("SELECT {} FROM {}").format(kolom, sql.Identifier(table_name))
+
+    conn = connect_db()
+    # Cursor bernama (server-side) agar hasil query tidak dimuat sekaligus ke memori klien
+    cur = conn.cursor(name=f'fetch_{table_name}')
+    cur.itersize = batch_size
+    batches = []
+    try:
+        cur.execute(query)
+        rows = cur.fetchmany(batch_size)
+
+        # Tipe kolom ditentukan dari tipe PostgreSQL, bukan dari isi tiap batch
+        names = [desc[0] for desc in cur.description]
+        konversi = tentukan_konversi(cur.description)
+        kategori = [desc[0] for desc in cur.description if desc[0] in KOLOM_KATEGORI and desc[1] in OID_TEKS]
+
+        while True:
+            batches.append(set_tipe_kolom(pd.DataFrame.from_records(rows, columns=names), konversi))
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                break
+    finally:
+        cur.close()
+        conn.close()
+
+    df = pd.concat(batches, ignore_index=True)
+    del batches
+
+    # Konversi ke kategori setelah digabung agar kategori seragam antar batch
+    for col in kategori:
+        df[col] = df[col].astype('category')
+    return df